@@ -1,44 +1,114 @@
 #!/usr/bin/env python3
-import serial
-import json
-import time
+import asyncio
+import math
+import struct
+
+import serial_asyncio
 
 # ==============================
 # SERIAL CONNECTION (USB ARDUINO)
 # ==============================
 # Change to /dev/ttyUSB0 if required
-arduino = serial.Serial('/dev/ttyACM0', 9600, timeout=1)
+SERIAL_PORT = '/dev/ttyACM0'
+BAUD_RATE = 9600
 
-ph_value = None
-turbidity_value = None
+# ==============================
+# FRAME FORMAT
+# ==============================
+# The Arduino sends fixed-size little-endian binary frames:
+#   0xAA | ph (float32) | turbidity (float32) | 0x55
+# Sketch side:
+#   Serial.write(0xAA);
+#   Serial.write((byte *)&ph, 4);
+#   Serial.write((byte *)&turbidity, 4);
+#   Serial.write(0x55);
+FRAME = struct.Struct('<BffB')
+FRAME_START = 0xAA
+FRAME_END = 0x55
 
 # ==============================
-# READ SENSOR DATA FUNCTION
+# FRAME ALIGNMENT
 # ==============================
-def read_arduino_sensors():
-    global ph_value, turbidity_value
-    try:
-        line = arduino.readline().decode().strip()
-        if line.startswith("{") and line.endswith("}"):
-            data = json.loads(line)
-
-            ph_value = float(data.get("ph"))
-            turbidity_value = float(data.get("turbidity"))
-            return True
-    except:
-        pass
-    return False
+def extract_latest_frame(buf):
+    """
+    Consume every complete frame at the front of buf.
+    Returns the newest valid frame as bytes, or None if there was none.
+    """
+    frame = None
+    while len(buf) >= FRAME.size:
+        # Realign on the next start byte, dropping anything before it
+        start = buf.find(FRAME_START)
+        if start == -1:
+            buf.clear()
+            break
+        if start:
+            del buf[:start]
+            continue
 
+        if buf[FRAME.size - 1] == FRAME_END:
+            frame = bytes(buf[:FRAME.size])
+            del buf[:FRAME.size]
+        else:
+            # False start byte inside a payload, slide forward one byte
+            del buf[0]
+    return frame
 
 # ==============================
-# MAIN LOOP
+# READ SENSOR DATA FUNCTION
+# ==============================
+def read_arduino_sensors(frame):
+    """
+    Unpack a complete Arduino frame.
+    Returns a (ph, turbidity) tuple, or None if the payload was corrupted
+    into a NaN or infinite reading.
+    """
+    _, ph, turbidity, _ = FRAME.unpack(frame)
+    if not (math.isfinite(ph) and math.isfinite(turbidity)):
+        return None
+    return ph, turbidity
+
 # ==============================
-print("\n📡 Reading from Arduino... (Press CTRL+C to stop)\n")
+# ASYNC TASKS
+# ==============================
+def publish(queue, reading):
+    """Replace whatever is in the single-slot queue with the newest reading."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(reading)
+
+async def arduino_task(reader, queue):
+    """Read frames from the Arduino and publish the newest reading."""
+    buf = bytearray()
+    while True:
+        data = await reader.read(FRAME.size)
+        if not data:
+            raise ConnectionError("Arduino serial port closed")
+        buf += data
+
+        frame = extract_latest_frame(buf)
+        if frame is not None:
+            reading = read_arduino_sensors(frame)
+            if reading is not None:
+                publish(queue, reading)
 
-while True:
-    if read_arduino_sensors():
+async def print_task(queue):
+    """Print each new reading as it arrives."""
+    while True:
+        ph_value, turbidity_value = await queue.get()
         print(f"pH: {ph_value:.2f} | Turbidity: {turbidity_value:.2f}")
-    else:
-        print("Waiting for data...")
 
-    time.sleep(1)
+async def main():
+    reader, _ = await serial_asyncio.open_serial_connection(url=SERIAL_PORT, baudrate=BAUD_RATE)
+    latest = asyncio.Queue(maxsize=1)
+    await asyncio.gather(arduino_task(reader, latest), print_task(latest))
+
+
+# ==============================
+# MAIN LOOP
+# ==============================
+if __name__ == "__main__":
+    print("\n📡 Reading from Arduino... (Press CTRL+C to stop)\n")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -5,87 +5,165 @@ Continuously monitors wlan0 interface for network connectivity
 and automatically starts the stats broadcaster server when connected.
 """
 
+import atexit
+import errno
+import fcntl
+import functools
+import ipaddress
 import socket
+import struct
 import subprocess
 import time
 import logging
+import logging.handlers
+import select
 import signal
 import sys
 import os
+import re
 from datetime import datetime
 
 # Configure logging
+# File writes are buffered in memory and flushed in batches (or immediately
+# on warnings), so slow SD card writes don't stall the monitor loop
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# MemoryHandler only buffers records; the file handler does the formatting
+log_file = logging.FileHandler('network_monitor.log')
+log_file.setFormatter(logging.Formatter(LOG_FORMAT))
+log_buffer = logging.handlers.MemoryHandler(
+    capacity=256,
+    flushLevel=logging.WARNING,
+    target=log_file
+)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('network_monitor.log'),
+        log_buffer,
         logging.StreamHandler()
     ]
 )
+atexit.register(log_buffer.flush)
 logger = logging.getLogger(__name__)
 
+# ioctl request number for reading an interface's IPv4 address (linux/sockios.h)
+SIOCGIFADDR = 0x8915
+
+# Global-scope IPv4 addresses in `ip addr show` output
+IP_ADDR_RE = re.compile(rb'inet (\d+\.\d+\.\d+\.\d+)/\d+ .*scope global')
+
+# Matched against /proc/<pid>/cmdline to find the server process
+SERVER_SCRIPT = b'stats_broadcaster.py'
+
+# Seconds a successful connectivity test is reused before probing again
+INTERNET_CACHE_TTL = 30
+
+# Failed tests are retried after a delay doubling from MIN up to MAX seconds
+INTERNET_BACKOFF_MIN = 1
+INTERNET_BACKOFF_MAX = 30
+
+# Netlink multicast groups and message types (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTM_NEWLINK = 16
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+LINK_EVENTS = (RTM_NEWLINK, RTM_NEWADDR, RTM_DELADDR)
+
+# struct nlmsghdr: length, type, flags, sequence, port id
+NLMSG_HEADER = struct.Struct('=IHHII')
+
+# /sys/class/net/<iface>/operstate values meaning the link can't carry traffic
+LINK_DOWN_STATES = (b'down', b'lowerlayerdown', b'notpresent', b'dormant')
+
+# Seconds between sanity checks when no netlink events arrive
+HEARTBEAT_INTERVAL = 60
+
+@functools.lru_cache(maxsize=256)
+def _classify_ip(ip):
+    """
+    Return True for a well-formed IPv4 address that is not loopback,
+    link-local or multicast. Cached, as the same few addresses are
+    checked on every tick.
+    """
+    try:
+        addr = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    return not (addr.is_loopback or addr.is_link_local or addr.is_multicast)
+
 class NetworkMonitor:
     def __init__(self, interface='wlan0', check_interval=5, script_path='./start_server.sh'):
         self.interface = interface
         self.check_interval = check_interval
         self.script_path = script_path
         self.server_process = None
+        self._server_pid = None
         self.is_connected = False
         self.last_ip = None
         self.running = True
         
+        # Persistent UDP socket: handle for interface ioctls and a route probe.
+        # connect() on UDP only consults the routing table, nothing is sent.
+        self._probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        
+        # Last internet connectivity result as (reachable, monotonic expiry)
+        self._internet_cache = (False, None)
+        self._internet_cache_ip = None
+        self._internet_backoff = INTERNET_BACKOFF_MIN
+        
+        # Cached descriptor for the interface's operstate file, opened lazily
+        self._operstate_fd = None
+        
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
-        logger.info(f"Received signal {signum}, shutting down...")
+        logger.info("Received signal %s, shutting down...", signum)
         self.running = False
         self._stop_server()
+        log_buffer.flush()
         sys.exit(0)
     
+    def _link_is_up(self):
+        """
+        Read the interface's operstate through a cached descriptor
+        Returns False only when the kernel reports the link as down
+        """
+        try:
+            if self._operstate_fd is None:
+                self._operstate_fd = os.open(f'/sys/class/net/{self.interface}/operstate', os.O_RDONLY)
+            state = os.pread(self._operstate_fd, 32, 0).strip()
+        except OSError as e:
+            # Interface missing or sysfs unavailable, let the IP lookup decide.
+            # Reopen next time in case the interface was re-created.
+            logger.debug("operstate read failed: %s", e)
+            if self._operstate_fd is not None:
+                os.close(self._operstate_fd)
+                self._operstate_fd = None
+            return True
+        return state not in LINK_DOWN_STATES
+    
     def get_interface_ip(self):
         """
-        Get IP address of the specified network interface using socket module
+        Get IP address of the specified network interface
         Returns IP address string if found, None otherwise
         """
+        # Method 1: Ask the kernel directly with SIOCGIFADDR (no fork, one syscall)
         try:
-            # Method 1: Using socket and connecting to get local IP
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.connect(("8.8.8.8", 80))
-                local_ip = s.getsockname()[0]
-                
-                # Verify this IP is actually on the wlan0 interface
-                if self._verify_ip_on_interface(local_ip):
-                    return local_ip
-                    
-        except Exception as e:
-            logger.debug(f"Socket method failed: {e}")
-        
-        # Method 2: Parse ip command output
-        try:
-            result = subprocess.run(
-                ['ip', 'addr', 'show', self.interface],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            for line in result.stdout.split('\n'):
-                if 'inet ' in line and 'scope global' in line:
-                    ip_info = line.strip().split()
-                    for item in ip_info:
-                        if '/' in item and not item.startswith('inet'):
-                            ip = item.split('/')[0]
-                            if self._is_valid_ip(ip):
-                                return ip
-                                
-        except subprocess.CalledProcessError as e:
-            logger.debug(f"ip command failed: {e}")
+            ifreq = struct.pack('256s', self.interface[:15].encode())
+            result = fcntl.ioctl(self._probe.fileno(), SIOCGIFADDR, ifreq)
+            ip = socket.inet_ntoa(result[20:24])
+            return ip if self._is_valid_ip(ip) else None
+        except OSError as e:
+            if e.errno in (errno.EADDRNOTAVAIL, errno.ENODEV):
+                # Interface has no IPv4 address or does not exist
+                return None
+            logger.debug("ioctl method failed: %s", e)
         
-        # Method 3: Using netifaces if available
+        # Method 2: Using netifaces if available
         try:
             import netifaces
             
@@ -100,48 +178,69 @@ class NetworkMonitor:
         except ImportError:
             logger.debug("netifaces module not available")
         except Exception as e:
-            logger.debug(f"netifaces method failed: {e}")
+            logger.debug("netifaces method failed: %s", e)
         
-        return None
-    
-    def _verify_ip_on_interface(self, ip):
-        """
-        Verify that the given IP address is actually assigned to the target interface
-        """
+        # Method 3: Parse ip command output as a last resort
         try:
             result = subprocess.run(
                 ['ip', 'addr', 'show', self.interface],
                 capture_output=True,
-                text=True,
                 check=True
             )
-            return ip in result.stdout
-        except:
-            return False
+            
+            for match in IP_ADDR_RE.finditer(result.stdout):
+                ip = match.group(1).decode()
+                if self._is_valid_ip(ip):
+                    return ip
+                                
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.debug("ip command failed: %s", e)
+        
+        return None
     
     def _is_valid_ip(self, ip):
         """
         Check if the IP address is valid and not a loopback address
         """
-        try:
-            socket.inet_aton(ip)
-            return not ip.startswith('127.') and not ip.startswith('169.254.')
-        except socket.error:
-            return False
+        return _classify_ip(ip)
+    
+    def _find_server_pids(self):
+        """
+        Scan /proc for stats broadcaster processes and yield their pids
+        """
+        own_pid = os.getpid()
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit() or int(entry) == own_pid:
+                continue
+            try:
+                with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                    if SERVER_SCRIPT in f.read():
+                        yield int(entry)
+            except OSError:
+                # Process exited while we were scanning
+                continue
     
     def _is_server_running(self):
         """
         Check if the stats broadcaster server is already running
         """
-        try:
-            result = subprocess.run(
-                ['pgrep', '-f', 'stats_broadcaster.py'],
-                capture_output=True,
-                text=True
-            )
-            return result.returncode == 0
-        except:
-            return False
+        # Fast path: we started the server and still hold its handle
+        if self.server_process and self.server_process.poll() is None:
+            return True
+        
+        # Server found by an earlier scan, probe it without forking
+        if self._server_pid is not None:
+            try:
+                os.kill(self._server_pid, 0)
+                return True
+            except PermissionError:
+                return True
+            except ProcessLookupError:
+                self._server_pid = None
+        
+        # Handle was lost (e.g. monitor restarted), fall back to scanning /proc
+        self._server_pid = next(self._find_server_pids(), None)
+        return self._server_pid is not None
     
     def _start_server(self):
         """
@@ -163,8 +262,15 @@ class NetworkMonitor:
                 preexec_fn=os.setsid  # Create new process group
             )
             
-            # Give it a moment to start
-            time.sleep(2)
+            # Wait up to 2s for the server process to appear, returning as
+            # soon as it does (or as soon as the launcher exits)
+            for _ in range(20):
+                if self.server_process.poll() is not None:
+                    break
+                self._server_pid = next(self._find_server_pids(), None)
+                if self._server_pid is not None:
+                    break
+                time.sleep(0.1)
             
             # Check if it's actually running
             if self._is_server_running():
@@ -175,7 +281,7 @@ class NetworkMonitor:
                 return False
                 
         except Exception as e:
-            logger.error(f"Error starting server: {e}")
+            logger.error("Error starting server: %s", e)
             return False
     
     def _stop_server(self):
@@ -184,10 +290,12 @@ class NetworkMonitor:
         """
         try:
             # Kill all processes matching the pattern
-            subprocess.run(
-                ['pkill', '-f', 'stats_broadcaster.py'],
-                capture_output=True
-            )
+            for pid in self._find_server_pids():
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            self._server_pid = None
             
             # If we have a direct process handle, terminate it
             if self.server_process:
@@ -205,32 +313,58 @@ class NetworkMonitor:
             logger.info("Stats broadcaster server stopped")
             
         except Exception as e:
-            logger.error(f"Error stopping server: {e}")
+            logger.error("Error stopping server: %s", e)
     
     def _test_internet_connectivity(self):
         """
         Test if we can actually reach the internet
+        Successes are reused for INTERNET_CACHE_TTL seconds, failures are
+        retried with exponential backoff
         """
+        reachable, expires_at = self._internet_cache
+        now = time.monotonic()
+        if expires_at is not None and now < expires_at:
+            return reachable
+        
         try:
+            # Cheap routing-table check first, fails fast with no default route
+            self._probe.connect(("8.8.8.8", 80))
+            
             # Try to connect to Google's DNS
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.settimeout(3)
                 s.connect(("8.8.8.8", 53))
-                return True
-        except:
-            return False
+            reachable = True
+        except OSError:
+            reachable = False
+        
+        if reachable:
+            self._internet_cache = (True, now + INTERNET_CACHE_TTL)
+            self._internet_backoff = INTERNET_BACKOFF_MIN
+        else:
+            self._internet_cache = (False, now + self._internet_backoff)
+            self._internet_backoff = min(self._internet_backoff * 2, INTERNET_BACKOFF_MAX)
+        return reachable
     
     def check_connection(self):
         """
         Check network connection status and manage server accordingly
         """
-        current_ip = self.get_interface_ip()
+        # A downed link can still hold its address for a while, so check the
+        # link state first and skip the lookup and connectivity test entirely
+        current_ip = self.get_interface_ip() if self._link_is_up() else None
+        
+        if current_ip != self._internet_cache_ip:
+            # Address changed, a cached connectivity result no longer applies
+            self._internet_cache = (False, None)
+            self._internet_cache_ip = current_ip
+            self._internet_backoff = INTERNET_BACKOFF_MIN
         
         if current_ip:
             # Test actual internet connectivity
             if self._test_internet_connectivity():
                 if not self.is_connected or current_ip != self.last_ip:
-                    logger.info(f"Network connected: {current_ip}")
+                    logger.info("Network connected: %s", current_ip)
                     self.is_connected = True
                     self.last_ip = current_ip
                     
@@ -245,39 +379,107 @@ class NetworkMonitor:
                         logger.warning("Server stopped unexpectedly, restarting...")
                         self._start_server()
             else:
-                logger.warning(f"Interface {self.interface} has IP {current_ip} but no internet connectivity")
+                logger.warning("Interface %s has IP %s but no internet connectivity", self.interface, current_ip)
                 if self.is_connected:
                     self.is_connected = False
                     self._stop_server()
         else:
             if self.is_connected:
-                logger.info(f"Network disconnected from {self.interface}")
+                logger.info("Network disconnected from %s", self.interface)
                 self.is_connected = False
                 self.last_ip = None
                 self._stop_server()
     
+    def _open_netlink(self):
+        """
+        Subscribe to kernel link and IPv4 address change notifications
+        Returns the netlink socket, or None if netlink is unavailable
+        """
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+            return sock
+        except (AttributeError, OSError) as e:
+            logger.warning("Netlink unavailable, falling back to polling: %s", e)
+            return None
+    
+    def _has_link_event(self, sock):
+        """
+        Read pending netlink messages and report whether any of them
+        is a link or address change
+        """
+        try:
+            data = sock.recv(65536)
+        except OSError as e:
+            # ENOBUFS means events were dropped, so re-check to be safe
+            logger.debug("Netlink receive failed: %s", e)
+            return True
+        
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            msg_len, msg_type = NLMSG_HEADER.unpack_from(data, offset)[:2]
+            if msg_type in LINK_EVENTS:
+                return True
+            if msg_len < NLMSG_HEADER.size:
+                break
+            # Messages are padded to 4-byte boundaries
+            offset += (msg_len + 3) & ~3
+        return False
+    
+    def _wait_for_link_event(self, sock, timeout):
+        """
+        Block until a link/address change arrives or the timeout expires
+        """
+        deadline = time.monotonic() + timeout
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable or self._has_link_event(sock):
+                return
+    
     def run(self):
         """
         Main monitoring loop
         """
-        logger.info(f"Starting network monitor for interface: {self.interface}")
-        logger.info(f"Check interval: {self.check_interval} seconds")
-        logger.info(f"Server script: {self.script_path}")
+        logger.info("Starting network monitor for interface: %s", self.interface)
+        logger.info("Server script: %s", self.script_path)
+        
+        netlink = self._open_netlink()
+        if netlink:
+            logger.info("Waiting for netlink events (heartbeat every %s seconds)", HEARTBEAT_INTERVAL)
+        else:
+            logger.info("Check interval: %s seconds", self.check_interval)
         
         while self.running:
             try:
                 self.check_connection()
-                time.sleep(self.check_interval)
+                
+                if netlink is None:
+                    time.sleep(self.check_interval)
+                    continue
+                
+                # An address without internet access may be about to come up,
+                # keep polling until the state settles, then wait for events
+                settled = self.is_connected or self._internet_cache_ip is None
+                timeout = HEARTBEAT_INTERVAL if settled else self.check_interval
+                self._wait_for_link_event(netlink, timeout)
                 
             except KeyboardInterrupt:
                 logger.info("Received keyboard interrupt, shutting down...")
                 break
             except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
+                logger.error("Error in monitoring loop: %s", e)
                 time.sleep(self.check_interval)
         
         # Clean up
         self._stop_server()
+        self._probe.close()
+        if self._operstate_fd is not None:
+            os.close(self._operstate_fd)
+        if netlink:
+            netlink.close()
         logger.info("Network monitor stopped")
 
 def main():
@@ -291,7 +493,7 @@ def main():
     
     # Check if script exists
     if not os.path.exists(SCRIPT_PATH):
-        logger.error(f"Server script not found: {SCRIPT_PATH}")
+        logger.error("Server script not found: %s", SCRIPT_PATH)
         sys.exit(1)
     
     # Create and run monitor
@@ -304,7 +506,7 @@ def main():
     try:
         monitor.run()
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -1,85 +1,226 @@
-import RPi.GPIO as GPIO
+import atexit
+import os
+import random
+import threading
 import time
 
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Not on a Pi: importers still get the simulated readings below
+    GPIO = None
+
+# Bound once for the simulated-data paths
+_UNIFORM = random.uniform
+_RANDOM = random.random
+
 # Pin Definitions
 TRIG = 23
 ECHO = 24
 TURBIDITY_D0 = 17
 
+# Half the speed of sound in cm/s (the echo travels there and back)
+_SPEED_HALF_CM = 17150
+# Scaled by 100 so distances are truncated to 0.01 cm with integer math
+_SPEED_HALF_CM_X100 = _SPEED_HALF_CM * 100
+
+# CPU-to-ambient temperature offset in millidegrees
+_TEMP_OFFSET_MC = 15500
+
+# Longest echo pulse the HC-SR04 produces (~38 ms when nothing is in range)
+ECHO_TIMEOUT = 0.05
+
+# pigpio's daemon timestamps GPIO edges in hardware with 1 µs resolution.
+# Use it when pigpiod is running, otherwise fall back to RPi.GPIO interrupts.
+try:
+    import pigpio
+    # show_errors=False keeps pigpio's multi-line banner off stdout when
+    # pigpiod isn't running, which is the normal RPi.GPIO fallback case
+    _pi = pigpio.pi(show_errors=False)
+    if not _pi.connected:
+        print("pigpiod not running, using RPi.GPIO edge interrupts")
+        _pi = None
+except ImportError:
+    _pi = None
+
+# Echo measurement state. The edge callbacks convert each completed pulse
+# into a distance, so callers can read the latest result without waiting.
+_echo_rise = 0
+_echo_done = threading.Event()
+_last_distance = None
+_last_distance_at = 0.0
+
+def _record_echo(pulse_duration):
+    global _last_distance, _last_distance_at
+    _last_distance = int(pulse_duration * _SPEED_HALF_CM_X100) / 100
+    _last_distance_at = time.monotonic()
+    _echo_done.set()
+
+def _echo_cb(channel):
+    """RPi.GPIO edge callback, timestamps with perf_counter_ns."""
+    global _echo_rise
+    now = time.perf_counter_ns()
+    if GPIO.input(channel):
+        _echo_rise = now
+    elif _echo_rise:
+        _record_echo((now - _echo_rise) * 1e-9)
+
+def _echo_tick_cb(gpio, level, tick):
+    """pigpio edge callback, tick is the daemon's µs timestamp."""
+    global _echo_rise
+    if level == 1:
+        _echo_rise = tick
+    elif level == 0 and _echo_rise:
+        _record_echo(pigpio.tickDiff(_echo_rise, tick) * 1e-6)
+
 # GPIO Setup with error handling
 GPIO_INITIALIZED = False
+_echo_callback = None
 try:
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(TRIG, GPIO.OUT)
-    GPIO.setup(ECHO, GPIO.IN)
-    GPIO.setup(TURBIDITY_D0, GPIO.IN)
+    if _pi is not None:
+        _pi.set_mode(TRIG, pigpio.OUTPUT)
+        _pi.set_mode(ECHO, pigpio.INPUT)
+        _pi.set_mode(TURBIDITY_D0, pigpio.INPUT)
+        _pi.write(TRIG, 0)
+        _echo_callback = _pi.callback(ECHO, pigpio.EITHER_EDGE, _echo_tick_cb)
+    elif GPIO is None:
+        raise RuntimeError("RPi.GPIO is not installed")
+    else:
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(TRIG, GPIO.OUT)
+        GPIO.setup(ECHO, GPIO.IN)
+        GPIO.setup(TURBIDITY_D0, GPIO.IN)
+        GPIO.add_event_detect(ECHO, GPIO.BOTH, callback=_echo_cb)
     GPIO_INITIALIZED = True
 except (RuntimeError, Exception) as e:
     print(f"Warning: GPIO initialization failed: {e}")
     print("Sensors will return simulated data.")
 
+# Keep the thermal zone open and pread() it, rather than open/read/close every tick
+try:
+    _TEMP_FD = os.open("/sys/class/thermal/thermal_zone0/temp", os.O_RDONLY)
+    atexit.register(os.close, _TEMP_FD)
+except OSError:
+    _TEMP_FD = None
+
+# Raw CPU temperature in millidegrees, None if there is no thermal zone
+def read_cpu_millidegrees():
+    if _TEMP_FD is None:
+        return None
+    return int(os.pread(_TEMP_FD, 16, 0))
+
 # Get CPU Temperature
 def get_cpu_temp():
     try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-            temp = int(f.read()) / 1000
-        return round(temp - 15.5, 2)
+        millidegrees = read_cpu_millidegrees()
+        return (millidegrees - _TEMP_OFFSET_MC) // 10 / 100
     except:
         # Simulated temperature if file not available
-        import random
-        return round(25.0 + random.uniform(-2.0, 2.0), 2)
+        return round(25.0 + _UNIFORM(-2.0, 2.0), 2)
+
+# Start an ultrasonic measurement without waiting for the echo
+def trigger_distance():
+    global _echo_rise
+    if not GPIO_INITIALIZED:
+        return
+
+    _echo_rise = 0
+    _echo_done.clear()
+
+    if _pi is not None:
+        # 10 µs trigger pulse generated by the daemon
+        _pi.gpio_trigger(TRIG, 10, 1)
+    else:
+        GPIO.output(TRIG, True)
+        time.sleep(0.00001)
+        GPIO.output(TRIG, False)
+
+# Distance from the most recent completed measurement, None if it is older
+# than max_age seconds (e.g. the last echo was lost)
+def latest_distance(max_age=2.0):
+    if not GPIO_INITIALIZED:
+        # Return simulated distance
+        return round(25.0 + _UNIFORM(-2.0, 2.0), 2)
+    if time.monotonic() - _last_distance_at > max_age:
+        return None
+    return _last_distance
 
 # Get Ultrasonic Distance
 def get_distance():
     if not GPIO_INITIALIZED:
-        # Return simulated distance
-        import random
-        return round(25.0 + random.uniform(-2.0, 2.0), 2)
+        return latest_distance()
     
-    GPIO.output(TRIG, False)
+    if _pi is None:
+        GPIO.output(TRIG, False)
     time.sleep(0.05)
 
-    GPIO.output(TRIG, True)
-    time.sleep(0.00001)
-    GPIO.output(TRIG, False)
+    trigger_distance()
 
-    while GPIO.input(ECHO) == 0:
-        pulse_start = time.time()
+    # Sleep until the falling edge callback fires instead of busy-waiting
+    if not _echo_done.wait(ECHO_TIMEOUT):
+        return None
 
-    while GPIO.input(ECHO) == 1:
-        pulse_end = time.time()
-
-    pulse_duration = pulse_end - pulse_start
-    distance = pulse_duration * 17150
-    return round(distance, 2)
+    return _last_distance
 
 # Get Turbidity Status
 def get_turbidity():
     if not GPIO_INITIALIZED:
         # Return simulated turbidity
-        import random
-        return "Clear" if random.random() > 0.2 else "Turbid"
+        return "Clear" if _RANDOM() > 0.2 else "Turbid"
     
-    if GPIO.input(TURBIDITY_D0) == GPIO.HIGH:
+    level = _pi.read(TURBIDITY_D0) if _pi is not None else GPIO.input(TURBIDITY_D0)
+    if level == 1:
         return "Clear"
     else:
         return "Turbid"
 
+# Reused by read_all_sensors so each tick updates values instead of building a dict
+_OUT = {"temperature_c": 0.0, "distance_cm": 0.0, "turbidity": ""}
+
 # Main function to return all values at once
 def read_all_sensors():
     try:
-        return {
-            "temperature_c": get_cpu_temp(),
-            "distance_cm": get_distance(),
-            "turbidity": get_turbidity()
-        }
+        _OUT["temperature_c"] = get_cpu_temp()
+        _OUT["distance_cm"] = get_distance()
+        _OUT["turbidity"] = get_turbidity()
+        return _OUT
     except Exception as e:
         return {"error": str(e)}
 
+# Pin this process to an isolated core with real-time priority so echo timing
+# isn't preempted. Reserve the core with isolcpus=3 in /boot/cmdline.txt.
+def set_realtime_priority(core=3, priority=80):
+    # The sched_* calls only change one thread, and the RPi.GPIO/pigpio threads
+    # that run the echo callbacks were started at import, so apply to every
+    # thread. Threads started later inherit the settings.
+    pinned = True
+    for tid in map(int, os.listdir("/proc/self/task")):
+        try:
+            os.sched_setaffinity(tid, {core})
+        except ProcessLookupError:
+            # Thread exited while we were iterating
+            continue
+        except OSError as e:
+            if pinned:
+                print(f"Warning: could not pin to CPU {core}: {e}")
+            pinned = False
+        try:
+            os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(priority))
+        except (PermissionError, ProcessLookupError):
+            # SCHED_FIFO needs root or CAP_SYS_NICE
+            pass
+
 # Cleanup function (call only on exit)
 def cleanup_gpio():
-    if GPIO_INITIALIZED:
+    if not GPIO_INITIALIZED:
+        return
+    if _pi is not None:
+        _echo_callback.cancel()
+        _pi.stop()
+    else:
         GPIO.cleanup()
 
 
-print(read_all_sensors())
\ No newline at end of file
+if __name__ == "__main__":
+    set_realtime_priority()
+    print(read_all_sensors())
\ No newline at end of file
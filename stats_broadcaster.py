@@ -5,15 +5,41 @@ Sends CPU, RAM, disk usage, and temperature data to connected clients every seco
 """
 
 import asyncio
+import heapq
 import json
 import logging
-import subprocess
+import os
+import socket
 import websockets
 import psutil
 from datetime import datetime
-from typing import Set, Dict, Any
+from typing import Dict, Any, Optional
+import threading
 import time
 import random
+import zlib
+
+# orjson serializes straight to UTF-8 bytes in C; fall back to the stdlib
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+# uvloop's libuv-based event loop has lower per-message overhead when installed
+try:
+    import uvloop
+    run_event_loop = uvloop.run
+except ImportError:
+    run_event_loop = asyncio.run
+
+def compress(payload: bytes) -> bytes:
+    """Raw DEFLATE (RFC 1951) the payload once for all clients."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(payload) + compressor.flush()
 
 # Configure logging first
 logging.basicConfig(
@@ -24,14 +50,31 @@ logging.basicConfig(
 # Import sensor_monitor.py after logging is configured
 try:
     import sensor_monitor
-    SENSORS_AVAILABLE = True
-    logging.info("sensor_monitor.py successfully imported - GPIO sensors available.")
 except (ImportError, Exception) as e:
-    SENSORS_AVAILABLE = False
+    sensor_monitor = None
     logging.warning(f"sensor_monitor.py not available - sensor data will be simulated. Reason: {e}")
+# sensor_monitor imports without RPi.GPIO too, so check that the pins were actually set up
+SENSORS_AVAILABLE = sensor_monitor is not None and sensor_monitor.GPIO_INITIALIZED
+if SENSORS_AVAILABLE:
+    logging.info("sensor_monitor.py successfully imported - GPIO sensors available.")
+elif sensor_monitor is not None:
+    logging.warning("GPIO initialization failed in sensor_monitor.py - sensor data will be simulated.")
 logger = logging.getLogger(__name__)
 
-connected_clients: Set = set()
+# websocket -> ClientSession
+connected_clients: Dict[Any, "ClientSession"] = {}
+
+# Frames buffered per client before the oldest is dropped
+CLIENT_QUEUE_SIZE = 10
+
+# Seconds between stats samples; each sample is broadcast as soon as it is ready
+STATS_INTERVAL = 1.0
+
+# Samples buffered for broadcast_stats before the oldest is dropped
+SAMPLE_QUEUE_SIZE = 4
+
+# Distinct field subscriptions of the connected clients, rebuilt on the event loop
+_field_signatures = frozenset()
 
 # -------- Sensor functions using sensor_monitor.py --------
 
@@ -39,9 +82,13 @@ def get_ultrasonic_distance():
     """Get distance reading from sensor_monitor.py or fallback."""
     if SENSORS_AVAILABLE:
         try:
-            return sensor_monitor.get_distance()
+            # Take the result of the previous trigger, then start the next
+            # measurement; the edge callback fills it in before the next tick
+            distance = sensor_monitor.latest_distance()
+            sensor_monitor.trigger_distance()
+            return distance
         except Exception as e:
-            logger.warning(f"sensor_monitor.get_distance() failed: {e}")
+            logger.warning(f"sensor_monitor distance read failed: {e}")
     # Fallback to simulated data
     return round(25.0 + random.uniform(-2.0, 2.0), 2)
 
@@ -62,14 +109,8 @@ def get_ambient_temp():
             return sensor_monitor.get_cpu_temp()
         except Exception as e:
             logger.warning(f"sensor_monitor.get_cpu_temp() failed: {e}")
-    # Fallback to reading thermal zone directly
-    try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-            temp = int(f.read()) / 1000
-        return round(temp - 15.5, 2)
-    except Exception as e:
-        # Final fallback to simulated data
-        return round(25.0 + random.uniform(-3.0, 3.0), 2)
+    # Fallback to simulated data
+    return round(25.0 + random.uniform(-3.0, 3.0), 2)
 
 def get_ph_level():
     """pH sensor not implemented in sensor_monitor.py, simulate only."""
@@ -77,159 +118,212 @@ def get_ph_level():
     variation = random.uniform(-0.3, 0.3)
     return round(base_ph + variation, 2)
 
-# -------- CPU temperature from vcgencmd --------
+# -------- Background sensor sampling --------
+
+# Sensor reads sleep and wait on echo timing, so they run on their own thread
+# at SENSOR_INTERVAL and get_stats only copies the latest values
+SENSOR_INTERVAL = 1.0
+_SENSOR_CACHE = {'ambient_temp': None, 'distance': None, 'turbidity': None, 'ph': None}
+_sensor_lock = threading.Lock()
+
+def _sensor_loop():
+    while True:
+        try:
+            readings = {
+                'ambient_temp': get_ambient_temp(),
+                'distance': get_ultrasonic_distance(),
+                'turbidity': get_turbidity_status(),
+                'ph': get_ph_level()
+            }
+            with _sensor_lock:
+                _SENSOR_CACHE.update(readings)
+        except Exception as e:
+            logger.error(f"Error sampling sensors: {e}")
+        time.sleep(SENSOR_INTERVAL)
+
+def start_sensor_sampler():
+    threading.Thread(target=_sensor_loop, name='sensors', daemon=True).start()
 
-def get_temperature() -> float:
+def read_sensor_cache() -> Dict[str, Any]:
+    with _sensor_lock:
+        return dict(_SENSOR_CACHE)
+
+# -------- CPU temperature from sysfs --------
+
+def get_temperature() -> Optional[float]:
+    """Pi CPU temperature in Celsius, read through sensor_monitor's thermal zone fd."""
+    if sensor_monitor is None:
+        return None
     try:
-        result = subprocess.run(
-            ['vcgencmd', 'measure_temp'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        temp_str = result.stdout.strip()
-        temp_value = temp_str.split('=')[1].replace("'C", "")
-        return float(temp_value)
+        millidegrees = sensor_monitor.read_cpu_millidegrees()
     except Exception as e:
         logger.warning(f"Failed to get temperature: {e}")
         return None
+    if millidegrees is None:
+        # No thermal zone on this machine, nothing to warn about every tick
+        return None
+    return millidegrees / 1000.0
 
 # -------- System stats collection --------
 
-def get_stats() -> Dict[str, Any]:
+# Bytes per GiB
+_GB = 1 << 30
+
+# Facts that don't change after boot, queried once at startup
+_CPU_COUNT_LOG = psutil.cpu_count(logical=True)
+_CPU_COUNT_PHYS = psutil.cpu_count(logical=False) or _CPU_COUNT_LOG
+_BOOT_TS = psutil.boot_time()
+_BOOT_TIME_ISO = datetime.fromtimestamp(_BOOT_TS).isoformat()
+_PARTITIONS = list(psutil.disk_partitions())
+_cpu_freq = psutil.cpu_freq()
+_CPU_FREQ_MIN = round(_cpu_freq.min, 2) if _cpu_freq else None
+_CPU_FREQ_MAX = round(_cpu_freq.max, 2) if _cpu_freq else None
+
+# Process objects reused across ticks so cpu_percent() measures since the last sample
+_proc_cache: Dict[int, psutil.Process] = {}
+
+def format_uptime(seconds: int) -> str:
+    """Format like str(timedelta) without microseconds, e.g. '2 days, 3:04:05'."""
+    days, rem = divmod(seconds, 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, secs = divmod(rem, 60)
+    clock = f"{hours}:{minutes:02d}:{secs:02d}"
+    if days:
+        return f"{days} day{'s' if days != 1 else ''}, {clock}"
+    return clock
+
+# Interface addresses rarely change, so the enumeration is rebuilt only when
+# it is older than NET_IF_CACHE_TTL seconds or an interface appears/disappears
+NET_IF_CACHE_TTL = 30
+_net_if_cache: Dict[str, Any] = {}
+_net_if_cache_ts = None
+_net_if_names = None
+# Address family labels; psutil.AF_LINK is AF_PACKET on Linux
+_FAMILY_NAMES = {
+    socket.AF_INET: 'AF_INET',
+    socket.AF_INET6: 'AF_INET6',
+    psutil.AF_LINK: 'AF_PACKET',
+}
+
+def _interface_names():
     try:
-        timestamp = datetime.now().isoformat()
-        cpu_percent = psutil.cpu_percent(interval=None)
-        cpu_count = psutil.cpu_count()
-        cpu_count_logical = psutil.cpu_count(logical=True)
-        cpu_freq = psutil.cpu_freq()
-        cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
-        memory = psutil.virtual_memory()
-        swap = psutil.swap_memory()
-        disk_root = psutil.disk_usage('/')
-        disk_io = psutil.disk_io_counters()
-
-        disk_partitions = []
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disk_partitions.append({
-                    'device': partition.device,
-                    'mountpoint': partition.mountpoint,
-                    'fstype': partition.fstype,
-                    'total_gb': round(usage.total / (1024**3), 2),
-                    'used_gb': round(usage.used / (1024**3), 2),
-                    'free_gb': round(usage.free / (1024**3), 2),
-                    'used_percent': round((usage.used / usage.total) * 100, 2)
-                })
-            except PermissionError:
-                continue
-
-        network_io = psutil.net_io_counters()
-        network_interfaces = {}
-        for interface, addrs in psutil.net_if_addrs().items():
-            interface_info = {'addresses': []}
-            for addr in addrs:
-                interface_info['addresses'].append({
-                    'family': str(addr.family),
-                    'address': addr.address,
-                    'netmask': addr.netmask,
-                    'broadcast': addr.broadcast
-                })
-            network_interfaces[interface] = interface_info
-
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processes.append({
-                    'pid': proc.info['pid'],
-                    'name': proc.info['name'],
-                    'cpu_percent': round(proc.info['cpu_percent'] or 0, 2),
-                    'memory_percent': round(proc.info['memory_percent'] or 0, 2)
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        top_processes = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:10]
-        boot_time = datetime.fromtimestamp(psutil.boot_time())
-        uptime_seconds = (datetime.now() - boot_time).total_seconds()
-
-        load_avg = None
-        try:
-            load_avg = psutil.getloadavg()
-        except AttributeError:
-            pass
+        return frozenset(os.listdir('/sys/class/net'))
+    except OSError:
+        return None
 
-        battery = None
-        try:
-            battery_info = psutil.sensors_battery()
-            if battery_info:
-                battery = {
-                    'percent': battery_info.percent,
-                    'power_plugged': battery_info.power_plugged,
-                    'secsleft': battery_info.secsleft if battery_info.secsleft != psutil.POWER_TIME_UNLIMITED else None
-                }
-        except AttributeError:
-            pass
+def get_network_interfaces() -> Dict[str, Any]:
+    global _net_if_cache, _net_if_cache_ts, _net_if_names
+    now = time.monotonic()
+    names = _interface_names()
+    if (_net_if_cache_ts is not None and now - _net_if_cache_ts < NET_IF_CACHE_TTL
+            and names == _net_if_names):
+        return _net_if_cache
 
-        pi_temperature = get_temperature()
-        ultrasonic_distance = get_ultrasonic_distance()
-        turbidity = get_turbidity_status()
-        ambient_temp = get_ambient_temp()
-        ph_level = get_ph_level()
+    network_interfaces = {}
+    for interface, addrs in psutil.net_if_addrs().items():
+        interface_info = {'addresses': []}
+        for addr in addrs:
+            interface_info['addresses'].append({
+                'family': _FAMILY_NAMES.get(addr.family, 'OTHER'),
+                'address': addr.address,
+                'netmask': addr.netmask,
+                'broadcast': addr.broadcast
+            })
+        network_interfaces[interface] = interface_info
 
-        sensors_temps = {}
-        try:
-            temps = psutil.sensors_temperatures()
-            for name, entries in temps.items():
-                sensor_data = []
-                for entry in entries:
-                    sensor_data.append({
-                        'label': entry.label or 'Unknown',
-                        'current': entry.current,
-                        'high': entry.high,
-                        'critical': entry.critical
-                    })
-                sensors_temps[name] = sensor_data
-        except AttributeError:
-            pass
+    _net_if_cache = network_interfaces
+    _net_if_cache_ts = now
+    _net_if_names = names
+    return network_interfaces
+
+# Top-level sections a client can subscribe to; 'timestamp' is always sent
+STATS_FIELDS = frozenset({
+    'system', 'cpu', 'memory', 'swap', 'disk', 'network',
+    'processes', 'temperature', 'custom_sensors', 'battery',
+})
 
-        stats = {
-            'timestamp': timestamp,
-            'system': {
-                'boot_time': boot_time.isoformat(),
+def get_stats(fields=None) -> Dict[str, Any]:
+    """Collect the stats sections in fields, or every section if fields is None."""
+    def wanted(section):
+        return fields is None or section in fields
+
+    try:
+        now_ts = time.time()
+        timestamp = datetime.fromtimestamp(now_ts).isoformat()
+        stats = {'timestamp': timestamp}
+
+        if wanted('system'):
+            uptime_seconds = now_ts - _BOOT_TS
+            load_avg = None
+            try:
+                load_avg = psutil.getloadavg()
+            except AttributeError:
+                pass
+            stats['system'] = {
+                'boot_time': _BOOT_TIME_ISO,
                 'uptime_seconds': round(uptime_seconds, 2),
-                'uptime_human': str(datetime.now() - boot_time).split('.')[0],
+                'uptime_human': format_uptime(int(uptime_seconds)),
                 'load_average': list(load_avg) if load_avg else None,
                 'connected_clients': len(connected_clients)
-            },
-            'cpu': {
+            }
+
+        if wanted('cpu'):
+            # One /proc/stat read gives both the per-core and the overall figure
+            cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
+            cpu_percent = sum(cpu_per_core) / len(cpu_per_core) if cpu_per_core else 0.0
+            cpu_freq = psutil.cpu_freq()
+            stats['cpu'] = {
                 'usage_percent': round(cpu_percent, 2),
-                'count_physical': cpu_count,
-                'count_logical': cpu_count_logical,
+                'count_physical': _CPU_COUNT_PHYS,
+                'count_logical': _CPU_COUNT_LOG,
                 'frequency_mhz': {
                     'current': round(cpu_freq.current, 2) if cpu_freq else None,
-                    'min': round(cpu_freq.min, 2) if cpu_freq else None,
-                    'max': round(cpu_freq.max, 2) if cpu_freq else None
+                    'min': _CPU_FREQ_MIN,
+                    'max': _CPU_FREQ_MAX
                 },
-                'per_core_usage': [round(x, 2) for x in cpu_per_core]
-            },
-            'memory': {
-                'total_gb': round(memory.total / (1024**3), 2),
-                'available_gb': round(memory.available / (1024**3), 2),
-                'used_gb': round(memory.used / (1024**3), 2),
-                'free_gb': round(memory.free / (1024**3), 2),
-                'used_percent': round(memory.percent, 2),
-                'cached_gb': round(memory.cached / (1024**3), 2),
-                'buffers_gb': round(memory.buffers / (1024**3), 2)
-            },
-            'swap': {
-                'total_gb': round(swap.total / (1024**3), 2),
-                'used_gb': round(swap.used / (1024**3), 2),
-                'free_gb': round(swap.free / (1024**3), 2),
-                'used_percent': round(swap.percent, 2)
-            },
-            'disk': {
+                'per_core_usage': cpu_per_core
+            }
+
+        if wanted('memory'):
+            memory = psutil.virtual_memory()
+            stats['memory'] = {
+                'total_gb': round(memory.total / _GB, 2),
+                'available_gb': round(memory.available / _GB, 2),
+                'used_gb': round(memory.used / _GB, 2),
+                'free_gb': round(memory.free / _GB, 2),
+                'used_percent': memory.percent,
+                'cached_gb': round(memory.cached / _GB, 2),
+                'buffers_gb': round(memory.buffers / _GB, 2)
+            }
+
+        if wanted('swap'):
+            swap = psutil.swap_memory()
+            stats['swap'] = {
+                'total_gb': round(swap.total / _GB, 2),
+                'used_gb': round(swap.used / _GB, 2),
+                'free_gb': round(swap.free / _GB, 2),
+                'used_percent': swap.percent
+            }
+
+        if wanted('disk'):
+            disk_root = psutil.disk_usage('/')
+            disk_io = psutil.disk_io_counters()
+            disk_partitions = []
+            for partition in _PARTITIONS:
+                try:
+                    usage = psutil.disk_usage(partition.mountpoint)
+                    disk_partitions.append({
+                        'device': partition.device,
+                        'mountpoint': partition.mountpoint,
+                        'fstype': partition.fstype,
+                        'total_gb': round(usage.total / _GB, 2),
+                        'used_gb': round(usage.used / _GB, 2),
+                        'free_gb': round(usage.free / _GB, 2),
+                        'used_percent': round((usage.used / usage.total) * 100, 2)
+                    })
+                except PermissionError:
+                    continue
+            stats['disk'] = {
                 'root_usage_percent': round((disk_root.used / disk_root.total) * 100, 2),
                 'partitions': disk_partitions,
                 'io_counters': {
@@ -240,8 +334,11 @@ def get_stats() -> Dict[str, Any]:
                     'read_time': disk_io.read_time if disk_io else None,
                     'write_time': disk_io.write_time if disk_io else None
                 }
-            },
-            'network': {
+            }
+
+        if wanted('network'):
+            network_io = psutil.net_io_counters()
+            stats['network'] = {
                 'io_counters': {
                     'bytes_sent': network_io.bytes_sent,
                     'bytes_recv': network_io.bytes_recv,
@@ -252,25 +349,81 @@ def get_stats() -> Dict[str, Any]:
                     'dropin': network_io.dropin,
                     'dropout': network_io.dropout
                 },
-                'interfaces': network_interfaces
-            },
-            'processes': {
+                'interfaces': get_network_interfaces()
+            }
+
+        if wanted('processes'):
+            processes = []
+            pids = psutil.pids()
+            for pid in _proc_cache.keys() - set(pids):
+                del _proc_cache[pid]
+            for pid in pids:
+                try:
+                    proc = _proc_cache.get(pid)
+                    if proc is None:
+                        proc = _proc_cache[pid] = psutil.Process(pid)
+                    # oneshot() reads each /proc/<pid> file once for all three values
+                    with proc.oneshot():
+                        processes.append({
+                            'pid': pid,
+                            'name': proc.name(),
+                            'cpu_percent': proc.cpu_percent() or 0,
+                            'memory_percent': round(proc.memory_percent() or 0, 2)
+                        })
+                except psutil.NoSuchProcess:
+                    _proc_cache.pop(pid, None)
+                except psutil.AccessDenied:
+                    continue
+            stats['processes'] = {
                 'total_count': len(processes),
-                'top_cpu_usage': top_processes
-            },
-            'temperature': {
+                'top_cpu_usage': heapq.nlargest(10, processes, key=lambda x: x['cpu_percent'])
+            }
+
+        if wanted('temperature'):
+            pi_temperature = get_temperature()
+            sensors_temps = {}
+            try:
+                temps = psutil.sensors_temperatures()
+                for name, entries in temps.items():
+                    sensor_data = []
+                    for entry in entries:
+                        sensor_data.append({
+                            'label': entry.label or 'Unknown',
+                            'current': entry.current,
+                            'high': entry.high,
+                            'critical': entry.critical
+                        })
+                    sensors_temps[name] = sensor_data
+            except AttributeError:
+                pass
+            stats['temperature'] = {
                 'pi_cpu_celsius': round(pi_temperature, 2) if pi_temperature is not None else None,
                 'sensors': sensors_temps
-            },
-            'custom_sensors': {
-                'ambient_temp_celsius': ambient_temp,
-                'ultrasonic_distance_cm': ultrasonic_distance,
-                'water_turbidity': turbidity,
-                'ph_level': ph_level,
-                'gpio_available': True
-            },
-            'battery': battery
-        }
+            }
+
+        if wanted('custom_sensors'):
+            sensors = read_sensor_cache()
+            stats['custom_sensors'] = {
+                'ambient_temp_celsius': sensors['ambient_temp'],
+                'ultrasonic_distance_cm': sensors['distance'],
+                'water_turbidity': sensors['turbidity'],
+                'ph_level': sensors['ph'],
+                'gpio_available': SENSORS_AVAILABLE
+            }
+
+        if wanted('battery'):
+            battery = None
+            try:
+                battery_info = psutil.sensors_battery()
+                if battery_info:
+                    battery = {
+                        'percent': battery_info.percent,
+                        'power_plugged': battery_info.power_plugged,
+                        'secsleft': battery_info.secsleft if battery_info.secsleft != psutil.POWER_TIME_UNLIMITED else None
+                    }
+            except AttributeError:
+                pass
+            stats['battery'] = battery
 
         return stats
 
@@ -283,13 +436,86 @@ def get_stats() -> Dict[str, Any]:
 
 # -------- WebSocket server --------
 
+class ClientSession:
+    """Outgoing queue for one client plus the task that drains it."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        # Whether the client holds the state the next patch applies to
+        self.synced = False
+        # Subscribed stats sections, None for all of them
+        self.fields = None
+        self.sender = asyncio.create_task(self._send_loop())
+
+    async def _send_loop(self):
+        # A slow client only ever waits on its own queue
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending to client {self.websocket.remote_address}: {e}")
+
+    def push(self, full, patch):
+        """Queue the next update without waiting.
+
+        Patches only apply on top of the previous message, so a new client or
+        one that has fallen a whole queue behind gets a full snapshot instead.
+        """
+        if patch is None or not self.synced or self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.synced = True
+            self.queue.put_nowait(full)
+        else:
+            self.queue.put_nowait(patch)
+
+    def close(self):
+        self.sender.cancel()
+
+def _refresh_field_signatures():
+    global _field_signatures
+    _field_signatures = frozenset(session.fields for session in connected_clients.values())
+
+def subscribe_client(websocket, message):
+    """Apply a {"fields": [...]} subscription; {"fields": null} restores every section."""
+    try:
+        request = json.loads(message)
+    except ValueError:
+        # Any client can send arbitrary text; don't let it flood the log
+        logger.debug(f"Ignoring malformed message from {websocket.remote_address}")
+        return
+    session = connected_clients.get(websocket)
+    if session is None or not isinstance(request, dict) or 'fields' not in request:
+        return
+
+    fields = request['fields']
+    if fields is None:
+        session.fields = None
+    elif isinstance(fields, list):
+        session.fields = STATS_FIELDS.intersection(f for f in fields if isinstance(f, str))
+    else:
+        logger.warning(f"Ignoring invalid fields from {websocket.remote_address}: {fields!r}")
+        return
+    # The next message must be a full snapshot of the new selection
+    session.synced = False
+    _refresh_field_signatures()
+    logger.info(f"Client {websocket.remote_address} subscribed to {sorted(session.fields) if session.fields is not None else 'all fields'}")
+
 async def register_client(websocket):
-    connected_clients.add(websocket)
+    connected_clients[websocket] = ClientSession(websocket)
+    _refresh_field_signatures()
     client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
     logger.info(f"Client connected: {client_info} (Total clients: {len(connected_clients)})")
 
 async def unregister_client(websocket):
-    connected_clients.discard(websocket)
+    session = connected_clients.pop(websocket, None)
+    if session:
+        session.close()
+    _refresh_field_signatures()
     client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
     logger.info(f"Client disconnected: {client_info} (Total clients: {len(connected_clients)})")
 
@@ -298,6 +524,7 @@ async def handle_client(websocket):
     try:
         async for message in websocket:
             logger.debug(f"Received message from {websocket.remote_address}: {message}")
+            subscribe_client(websocket, message)
     except websockets.exceptions.ConnectionClosed:
         pass
     except Exception as e:
@@ -305,33 +532,116 @@ async def handle_client(websocket):
     finally:
         await unregister_client(websocket)
 
-async def broadcast_stats():
+def diff_stats(old, new, path=(), ops=None):
+    """
+    List the changes that turn the old stats dict into the new one.
+    Each op is [path, value] to set a key or [path] to delete it; lists are replaced whole.
+    """
+    if ops is None:
+        ops = []
+    for key, value in new.items():
+        if key not in old:
+            ops.append([[*path, key], value])
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            diff_stats(previous, value, (*path, key), ops)
+        elif value != previous:
+            ops.append([[*path, key], value])
+    for key in old:
+        if key not in new:
+            ops.append([[*path, key]])
+    return ops
+
+def project_stats(stats, fields):
+    """Keep the subscribed sections plus the timestamp and any error."""
+    if fields is None:
+        return stats
+    return {key: value for key, value in stats.items() if key not in STATS_FIELDS or key in fields}
+
+def _stats_loop(loop, samples):
+    """
+    Sample and encode stats off the event loop.
+    Every (sequence, {fields: (full snapshot, patch)}) sample is queued for broadcast_stats.
+    """
+    seq = 0
+    # fields -> stats last encoded for that subscription
+    previous = {}
+    while True:
+        started = time.monotonic()
+        try:
+            signatures = _field_signatures
+            if signatures:
+                # Only collect sections somebody is subscribed to
+                wanted = None if None in signatures else frozenset().union(*signatures)
+                stats = get_stats(wanted)
+                payloads = {}
+                latest = {}
+                # Each distinct subscription is encoded once, however many clients share it
+                for fields in signatures:
+                    view = project_stats(stats, fields)
+                    full = compress(dumps({'type': 'full', 'data': view}))
+                    patch = None
+                    if fields in previous:
+                        patch = compress(dumps({'type': 'patch', 'ops': diff_stats(previous[fields], view)}))
+                    payloads[fields] = (full, patch)
+                    latest[fields] = view
+                previous = latest
+                seq += 1
+                # Queue every sample so the patch chain is never broken by a missed tick
+                try:
+                    loop.call_soon_threadsafe(_queue_sample, samples, (seq, payloads))
+                except RuntimeError:
+                    # Event loop closed, the server is shutting down
+                    return
+            else:
+                # Don't patch against a stale sample once a client connects again
+                previous = {}
+        except Exception as e:
+            logger.error(f"Error in stats sampler: {e}")
+        time.sleep(max(0.0, STATS_INTERVAL - (time.monotonic() - started)))
+
+def _queue_sample(samples, sample):
+    # Runs on the event loop. If it has stalled, drop the oldest sample; the
+    # gap in sequence numbers makes broadcast_stats resync every client.
+    if samples.full():
+        samples.get_nowait()
+    samples.put_nowait(sample)
+
+def start_stats_sampler(samples):
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=_stats_loop, args=(loop, samples), name='stats', daemon=True).start()
+
+async def broadcast_stats(samples):
+    last_seq = None
     while True:
         try:
+            seq, payloads = await samples.get()
             if connected_clients:
-                stats = get_stats()
-                stats_json = json.dumps(stats)
-                disconnected_clients = set()
-                for client in connected_clients:
-                    try:
-                        await client.send(stats_json)
-                    except websockets.exceptions.ConnectionClosed:
-                        disconnected_clients.add(client)
-                    except Exception as e:
-                        logger.error(f"Error sending to client {client.remote_address}: {e}")
-                        disconnected_clients.add(client)
-                for client in disconnected_clients:
-                    await unregister_client(client)
-                if len(connected_clients) > 0:
-                    logger.debug(f"Broadcasted stats to {len(connected_clients)} clients")
-            await asyncio.sleep(1)
+                # A skipped sample breaks the patch chain, resync everyone
+                resync = last_seq is None or seq != last_seq + 1
+                # Snapshot the sessions so clients joining or leaving can't disturb the fan-out
+                sessions = tuple(connected_clients.values())
+                # Hand the payload to each client's sender task; never wait on a client here
+                for session in sessions:
+                    messages = payloads.get(session.fields)
+                    if messages is None:
+                        # Subscribed after this sample was taken, served from the next one
+                        continue
+                    full, patch = messages
+                    session.push(full, None if resync else patch)
+                last_seq = seq
+                logger.debug(f"Broadcasted stats to {len(sessions)} clients")
         except Exception as e:
             logger.error(f"Error in broadcast loop: {e}")
-            await asyncio.sleep(1)
 
 async def main():
     host = "0.0.0.0"
     port = 8765
+    start_sensor_sampler()
+    # Samples handed from the sampler thread to broadcast_stats
+    samples = asyncio.Queue(maxsize=SAMPLE_QUEUE_SIZE)
+    start_stats_sampler(samples)
     logger.info(f"Starting WebSocket server on {host}:{port}")
     server = await websockets.serve(
         handle_client,
@@ -339,10 +649,12 @@ async def main():
         port,
         ping_interval=20,
         ping_timeout=10,
-        close_timeout=10
+        close_timeout=10,
+        # Payloads are compressed once in broadcast_stats, not per connection
+        compression=None
     )
     logger.info(f"WebSocket server started on ws://{host}:{port}")
-    broadcast_task = asyncio.create_task(broadcast_stats())
+    broadcast_task = asyncio.create_task(broadcast_stats(samples))
     try:
         await asyncio.gather(server.wait_closed(), broadcast_task)
     except KeyboardInterrupt:
@@ -350,9 +662,9 @@ async def main():
         server.close()
         await server.wait_closed()
         broadcast_task.cancel()
-        if GPIO_AVAILABLE:
+        if SENSORS_AVAILABLE:
             try:
-                GPIO.cleanup()
+                sensor_monitor.cleanup_gpio()
                 logger.info("GPIO cleanup completed")
             except Exception as e:
                 logger.error(f"Error during GPIO cleanup: {e}")
@@ -360,11 +672,11 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run_event_loop(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
-        if GPIO_AVAILABLE:
+        if SENSORS_AVAILABLE:
             try:
-                GPIO.cleanup()
+                sensor_monitor.cleanup_gpio()
             except:
                 pass